@@ -3,6 +3,8 @@ from collections.abc import Iterable
 from abc import ABCMeta, abstractmethod
 import os
 import textwrap
+import hashlib
+import functools
 import re
 import jinja2
 
@@ -19,6 +21,135 @@ from .run import *
 __all__ = ["Platform", "TemplatedPlatform"]
 
 
+# Number of compiled templates kept in memory, by Jinja as well as by the fast path below.
+_template_cache_size = 400
+
+
+def _normalize_template(source):
+    # Templates are written indented to match the surrounding Python code.
+    return textwrap.dedent(source).strip()
+
+
+def _load_template(source):
+    # Templates are identified by their own source text. This way, each distinct template is
+    # dedented, parsed, and compiled only once per process, no matter how many platform classes
+    # or builds use it.
+    return _normalize_template(source), None, lambda: True
+
+
+@functools.lru_cache(maxsize=_template_cache_size)
+def _get_fast_renderer(source):
+    # Many templates (file names, and most commands of vendor toolchains driven by a script) only
+    # substitute a few plain variables, like `tclsh {{name}}.tcl`. Such templates are rendered
+    # by joining strings, without involving Jinja at all. The returned function returns `None`
+    # if any of the substituted values is not a string, in which case Jinja must be used.
+    source = _normalize_template(source)
+    if not re.match(r"^[^{}]*(?:\{\{\s*\w+\s*\}\}[^{}]*)*$", source):
+        return None
+
+    parts = re.split(r"\{\{\s*(\w+)\s*\}\}", source)
+    def fast_renderer(context):
+        rendered = list(parts)
+        for index in range(1, len(parts), 2):
+            value = context.get(parts[index])
+            if not isinstance(value, str):
+                return None
+            rendered[index] = value
+        return "".join(rendered)
+    return fast_renderer
+
+
+def _options_filter(opts):
+    if isinstance(opts, str):
+        return opts
+    else:
+        return " ".join(opts)
+
+
+@jinja2.pass_context
+def _hierarchy_filter(context, signal, separator):
+    return separator.join(context["platform"]._name_map[signal][1:])
+
+
+def _ascii_escape_filter(string):
+    def escape_one(match):
+        if match.group(1) is None:
+            return match.group(2)
+        else:
+            return "_{:02x}_".format(ord(match.group(1)[0]))
+    return "".join(escape_one(m) for m in re.finditer(r"([^A-Za-z0-9_])|(.)", string))
+
+
+def _tcl_escape_filter(string):
+    return "{" + re.sub(r"([{}\\])", r"\\\1", string) + "}"
+
+
+def _tcl_quote_filter(string):
+    return '"' + re.sub(r"([$[\\])", r"\\\1", string) + '"'
+
+
+_jinja_env_options = {
+    "trim_blocks": True,
+    "lstrip_blocks": True,
+    "undefined": jinja2.StrictUndefined,
+    # Template sources are Python strings that never change once loaded, so there is nothing
+    # to reload.
+    "auto_reload": False,
+    "cache_size": _template_cache_size,
+}
+
+
+class _BytecodeCache(jinja2.FileSystemBytecodeCache):
+    # The bytecode cache is only an optimization. Failing to access it (e.g. because a temporary
+    # file cleaner has removed the cache directory, or the disk is full) must never fail a build.
+    def load_bytecode(self, bucket):
+        try:
+            super().load_bytecode(bucket)
+        except OSError:
+            pass
+
+    def dump_bytecode(self, bucket):
+        try:
+            super().dump_bytecode(bucket)
+        except OSError:
+            pass
+
+
+def _make_bytecode_cache(directory=None):
+    # Keeping compiled templates on disk lets repeated builds in fresh processes (e.g. in CI or
+    # an edit-build loop) skip template compilation. If no safe per-user cache directory can be
+    # found, templates are compiled in memory only.
+    #
+    # Jinja keys cached bytecode only on the template source, not on the options it was compiled
+    # with nor the version of Jinja that generated it. Include the Amaranth and Jinja versions and
+    # the environment options in the cache file names, so that different installations sharing
+    # the cache directory never load each other's compiled templates.
+    cache_key = hashlib.sha1(repr((__version__, jinja2.__version__,
+                                   sorted(_jinja_env_options.items())))
+                             .encode("utf-8")).hexdigest()[:16]
+    try:
+        return _BytecodeCache(directory,
+            pattern="__amaranth_jinja2_{}_%s.cache".format(cache_key))
+    except (OSError, RuntimeError):
+        return None
+
+
+@functools.lru_cache(maxsize=None)
+def _get_jinja_env():
+    # The environment is created on first use rather than on import, since setting up
+    # the bytecode cache may create a directory.
+    jinja_env = jinja2.Environment(
+        loader=jinja2.FunctionLoader(_load_template),
+        bytecode_cache=_make_bytecode_cache(),
+        **_jinja_env_options)
+    jinja_env.filters["options"] = _options_filter
+    jinja_env.filters["hierarchy"] = _hierarchy_filter
+    jinja_env.filters["ascii_escape"] = _ascii_escape_filter
+    jinja_env.filters["tcl_escape"] = _tcl_escape_filter
+    jinja_env.filters["tcl_quote"] = _tcl_quote_filter
+    return jinja_env
+
+
 class Platform(ResourceManager, metaclass=ABCMeta):
     resources      = property(abstractmethod(lambda: None))
     connectors     = property(abstractmethod(lambda: None))
@@ -416,29 +547,6 @@ class TemplatedPlatform(Platform):
             else:
                 assert False
 
-        def options(opts):
-            if isinstance(opts, str):
-                return opts
-            else:
-                return " ".join(opts)
-
-        def hierarchy(signal, separator):
-            return separator.join(self._name_map[signal][1:])
-
-        def ascii_escape(string):
-            def escape_one(match):
-                if match.group(1) is None:
-                    return match.group(2)
-                else:
-                    return "_{:02x}_".format(ord(match.group(1)[0]))
-            return "".join(escape_one(m) for m in re.finditer(r"([^A-Za-z0-9_])|(.)", string))
-
-        def tcl_escape(string):
-            return "{" + re.sub(r"([{}\\])", r"\\\1", string) + "}"
-
-        def tcl_quote(string):
-            return '"' + re.sub(r"([$[\\])", r"\\\1", string) + '"'
-
         def verbose(arg):
             if get_override_flag("verbose"):
                 return arg
@@ -452,19 +560,7 @@ class TemplatedPlatform(Platform):
                 return arg
 
         def render(source, origin, syntax=None):
-            try:
-                source   = textwrap.dedent(source).strip()
-                compiled = jinja2.Template(source,
-                    trim_blocks=True, lstrip_blocks=True, undefined=jinja2.StrictUndefined)
-                compiled.environment.filters["options"] = options
-                compiled.environment.filters["hierarchy"] = hierarchy
-                compiled.environment.filters["ascii_escape"] = ascii_escape
-                compiled.environment.filters["tcl_escape"] = tcl_escape
-                compiled.environment.filters["tcl_quote"] = tcl_quote
-            except jinja2.TemplateSyntaxError as e:
-                e.args = ("{} (at {}:{})".format(e.message, origin, e.lineno),)
-                raise
-            return compiled.render({
+            context = {
                 "name": name,
                 "platform": self,
                 "emit_rtlil": emit_rtlil,
@@ -478,7 +574,18 @@ class TemplatedPlatform(Platform):
                 "verbose": verbose,
                 "quiet": quiet,
                 "autogenerated": autogenerated,
-            })
+            }
+            fast_renderer = _get_fast_renderer(source)
+            if fast_renderer is not None:
+                rendered = fast_renderer(context)
+                if rendered is not None:
+                    return rendered
+            try:
+                compiled = _get_jinja_env().get_template(source)
+            except jinja2.TemplateSyntaxError as e:
+                e.args = ("{} (at {}:{})".format(e.message, origin, e.lineno),)
+                raise
+            return compiled.render(context)
 
         plan = BuildPlan(script="build_{}".format(name))
         for filename_tpl, content_tpl in self.file_templates.items():
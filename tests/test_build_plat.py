@@ -1,5 +1,13 @@
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+import jinja2
+
 from amaranth import *
 from amaranth.build.plat import *
+from amaranth.build.plat import (_get_jinja_env, _make_bytecode_cache, _load_template,
+                                 _get_fast_renderer)
 
 from .utils import *
 
@@ -62,3 +70,103 @@ class PlatformTestCase(FHDLTestCase):
                          ["baz.vhd"])
         self.assertEqual(list(self.platform.iter_files(".v", ".vhd")),
                          ["foo.v", "bar.v", "baz.vhd"])
+
+
+class MockTemplatedPlatform(TemplatedPlatform):
+    resources  = []
+    connectors = []
+
+    required_tools = []
+    toolchain      = "Mock"
+
+    file_templates = {
+        **TemplatedPlatform.build_script_templates,
+        "{{name}}.txt": """
+            # {{autogenerated}}
+            {% for n in range(2) %}
+                line {{n}}
+            {% endfor %}
+        """,
+    }
+    command_templates = [
+        """
+        mock
+            {{name}}.txt
+        """,
+    ]
+
+
+class TemplatedPlatformTestCase(FHDLTestCase):
+    def setUp(self):
+        # Use a fresh template environment for each test, and keep its compiled templates out of
+        # the real per-user cache directory.
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        patcher = patch("amaranth.build.plat._make_bytecode_cache",
+                        lambda: _make_bytecode_cache(self.cache_dir))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        _get_jinja_env.cache_clear()
+        self.addCleanup(_get_jinja_env.cache_clear)
+
+    def test_render(self):
+        plan = MockTemplatedPlatform().prepare(Module(), name="foo")
+        self.assertRegex(plan.files["foo.txt"],
+            r"^# Automatically generated by Amaranth .+\. Do not edit\.\n"
+            r"    line 0\n    line 1$")
+        self.assertRegex(plan.files["build_foo.sh"], r"\nmock foo\.txt$")
+
+    def test_template_compiled_once(self):
+        source = "{% for n in range(3) %}{{n}}{% endfor %} (compiled once)"
+        class OncePlatform(MockTemplatedPlatform):
+            file_templates = {"{{name}}.once": source}
+        loader = _get_jinja_env().loader
+        with patch.object(loader, "load_func", wraps=loader.load_func) as load_func:
+            for _ in range(2):
+                plan = OncePlatform().prepare(Module(), name="foo")
+                self.assertEqual(plan.files["foo.once"], "012 (compiled once)")
+        self.assertEqual([args for args, kwargs in load_func.call_args_list].count((source,)), 1)
+
+    def test_template_syntax_error(self):
+        class BrokenPlatform(MockTemplatedPlatform):
+            command_templates = ["{{name"]
+        with self.assertRaisesRegex(jinja2.TemplateSyntaxError,
+                r"\(at <command#1>:1\)$"):
+            BrokenPlatform().prepare(Module(), name="foo")
+
+    def test_bytecode_cache(self):
+        plan = MockTemplatedPlatform().prepare(Module(), name="foo")
+        _get_jinja_env.cache_clear()
+        with patch.object(_get_jinja_env(), "compile") as compile:
+            self.assertEqual(MockTemplatedPlatform().prepare(Module(), name="foo").files,
+                             plan.files)
+        compile.assert_not_called()
+
+    def test_bytecode_cache_key(self):
+        pattern = _make_bytecode_cache(self.cache_dir).pattern
+        with patch.object(jinja2, "__version__", "0.0"):
+            self.assertNotEqual(_make_bytecode_cache(self.cache_dir).pattern, pattern)
+
+    def test_bytecode_cache_unavailable(self):
+        MockTemplatedPlatform().prepare(Module(), name="foo")
+        self.assertNotEqual(os.listdir(self.cache_dir), [])
+        shutil.rmtree(self.cache_dir)
+        class NewPlatform(MockTemplatedPlatform):
+            file_templates = {"{{name}}.new": "{% if true %}new{% endif %}"}
+        plan = NewPlatform().prepare(Module(), name="foo")
+        self.assertEqual(plan.files["foo.new"], "new")
+
+    def test_template_dedent(self):
+        source, _, uptodate = _load_template("""
+            foo
+              {{name}}
+        """)
+        self.assertEqual(source, "foo\n  {{name}}")
+        self.assertTrue(uptodate())
+
+    def test_fast_renderer(self):
+        fast_renderer = _get_fast_renderer(" tclsh {{ name }}.tcl\n")
+        self.assertEqual(fast_renderer({"name": "foo"}), "tclsh foo.tcl")
+        self.assertIsNone(fast_renderer({"name": 1}))
+        self.assertIsNone(_get_fast_renderer("{{name|lower}}"))
+        self.assertIsNone(_get_fast_renderer("{% if name %}{{name}}{% endif %}"))